@@ -9,30 +9,33 @@ class BandwidthMonitor:
         window_size (int): The size of the moving median window in seconds.
         _bytes_received (deque): A deque to store the number of bytes received.
         _timestamps (deque): A deque to store the timestamps of received bytes.
+        _total_bytes (int): Running sum of bytes in the window, kept in sync with `_bytes_received`.
     """
 
     def __init__(self, window_size: int = 60) -> None:
         self._window_size = window_size
         self._bytes_received = deque()
         self._timestamps = deque()
+        self._total_bytes = 0
 
     def reset(self):
         self._bytes_received.clear()
         self._timestamps.clear()
+        self._total_bytes = 0
 
     def register_received_bytes(self, received_bytes: int) -> None:
-        current_time = time.time()
+        current_time = time.monotonic()
         self._bytes_received.append(received_bytes)
         self._timestamps.append(current_time)
+        self._total_bytes += received_bytes
 
         while len(self._timestamps) > 0 and current_time - self._timestamps[0] > self._window_size:
             self._timestamps.popleft()
-            self._bytes_received.popleft()
+            self._total_bytes -= self._bytes_received.popleft()
 
     def get_bandwidth(self) -> int:
         elapsed_time = self._timestamps[-1] - self._timestamps[0] if len(self._timestamps) > 1 else 1
-        total_bytes_received = sum(self._bytes_received)
-        return int(total_bytes_received / elapsed_time)
+        return int(self._total_bytes / elapsed_time)
 
     def get_bandwidth_str(self):
         return BandwidthFormatter.format(self.get_bandwidth())
@@ -1,8 +1,10 @@
+import sys
+
 import pygame
 from pygame import QUIT
 
 from connection import AutoReconnectClient
-from constants import HOST, PORT, FPS
+from constants import HOST, PORT, FPS, READER_CPU, SWITCH_INTERVAL, UNIX_SOCKET
 from lock import AutoLockingValue
 from pipeline import CaptureEncodeSendPipeline
 from pread import SocketDataReader
@@ -45,10 +47,10 @@ class Client:
         self._fps = fps
         self._running = False
 
-        self._connection = AutoReconnectClient(host, port)
+        self._connection = AutoReconnectClient(host, port, unix_socket=UNIX_SOCKET)
         self._socket_reader = SocketDataReader(self._connection)
         self._socket_writer = SocketDataWriter(self._connection)
-        self._packet_processor = PacketProcessor(self._socket_reader)
+        self._packet_processor = PacketProcessor(self._socket_reader, READER_CPU)
         self._command_executor = CommandProcessor(self._packet_processor)
         self._pipeline = CaptureEncodeSendPipeline(fps, self._socket_writer)
 
@@ -57,6 +59,7 @@ class Client:
             raise RuntimeError("The 'run' method can only be called once")
         self._running = True
         self._connection.start()
+        self._socket_writer.start()
         self._packet_processor.start()
         self._pipeline.start()
         self._command_executor.start()
@@ -81,12 +84,14 @@ class Client:
     def stop(self):
         self._running = False
         self._connection.stop()
+        self._socket_writer.stop()
         self._command_executor.stop()
         self._packet_processor.stop()
         self._pipeline.stop()
 
 
 if __name__ == "__main__":
+    sys.setswitchinterval(SWITCH_INTERVAL)
     try:
         client = Client(HOST, PORT, 200, 200, FPS)
         client.run()
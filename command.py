@@ -1,14 +1,29 @@
 from abc import ABC, abstractmethod
+from struct import Struct
 
 import pyautogui
 
 from connection import NoConnection
 from dao import MouseMoveData, MouseClickData, KeyboardData
-from enums import MouseButton, ButtonState
-from packet import Packet
-from pfactory import MouseMovePacketFactory, MouseClickPacketFactory, KeyboardEventPacketFactory
+from enums import MouseButton, ButtonState, PacketType
 from pwrite import SocketDataWriter
 
+# Precompiled layouts of input event packets, same as the ones created by packet factories.
+# Input commands keep their fields and pack them straight into the batch buffer, no packet is created per event.
+_MOUSE_MOVE_PACKET = Struct('>BII')  # packet type, x, y
+_MOUSE_CLICK_PACKET = Struct('>BBBII')  # packet type, button, state, x, y
+_KEYBOARD_EVENT_HEADER = Struct('>BI')  # packet type, key code length, followed by key code and state byte
+
+
+def _reserve(buffer: bytearray, end: int) -> int:
+    """
+    Extends the buffer, so it is at least `end` bytes long, and returns `end`.
+    """
+    if len(buffer) < end:
+        # Grow at least twice, batches of similar size do not extend buffer again
+        buffer.extend(bytes(max(end - len(buffer), len(buffer))))
+    return end
+
 
 class Command(ABC):
 
@@ -21,37 +36,133 @@ class Command(ABC):
 
 
 class NetworkCommand(Command):
-    def __init__(self, socket_writer: SocketDataWriter, packet: Packet):
+    def __init__(self, socket_writer: SocketDataWriter):
         self._socket_writer = socket_writer
-        self._packet = packet
 
     def execute(self, *args, **kwargs):
+        buffer = bytearray()
+        size = self.write_into(buffer, 0)
         try:
-            self._socket_writer.write_packet(self._packet)
+            self._socket_writer.write_bytes(memoryview(buffer)[:size])
         except NoConnection:
             # There is no connection, ignore
             pass
 
+    @abstractmethod
+    def write_into(self, buffer: bytearray, offset: int) -> int:
+        """
+        Writes the command packet into the buffer at the offset instead of sending it.
+        The buffer is extended when the packet does not fit.
+
+        Returns:
+            The position in the buffer right after the packet.
+        """
+        raise NotImplementedError
+
+
+class NetworkBatchCommand(Command):
+    """
+    Collects packets of network commands and sends them with a single socket write.
+
+    Example usage:
+
+        batch = NetworkBatchCommand(socket_writer)
+        batch.add(mouse_click_command)
+        batch.add(keyboard_event_command)
+        batch.execute()  # Sends both packets and empties the batch
+
+    Attributes:
+        _socket_writer (SocketDataWriter): The socket data writer object.
+        _buffer (bytearray): Serialized packets of added commands, allocated once and reused between batches.
+        _size (int): Length of serialized packets at the start of the buffer.
+    """
+
+    def __init__(self, socket_writer: SocketDataWriter, capacity: int = 4096):
+        self._socket_writer = socket_writer
+        self._buffer = bytearray(capacity)
+        self._size = 0
+
+    def add(self, command: NetworkCommand) -> None:
+        self._size = command.write_into(self._buffer, self._size)
+
+    def execute(self, *args, **kwargs):
+        if not self._size:
+            return
+        try:
+            # Buffer keeps its capacity, only the filled part is sent
+            with memoryview(self._buffer)[:self._size] as data:
+                self._socket_writer.write_bytes(data)
+        except NoConnection:
+            # There is no connection, ignore
+            pass
+        finally:
+            self._size = 0
+
 
 class MouseMoveNetworkCommand(NetworkCommand):
 
     def __init__(self, socket_writer: SocketDataWriter, x: int, y: int):
-        packet = MouseMovePacketFactory.create_packet(x, y)
-        super().__init__(socket_writer, packet)
+        super().__init__(socket_writer)
+        self._x = x
+        self._y = y
+
+    def set(self, x: int, y: int) -> None:
+        """
+        Reuses the command for another mouse position.
+        """
+        self._x = x
+        self._y = y
+
+    def write_into(self, buffer: bytearray, offset: int) -> int:
+        end = _reserve(buffer, offset + _MOUSE_MOVE_PACKET.size)
+        _MOUSE_MOVE_PACKET.pack_into(buffer, offset, PacketType.MOUSE_MOVE, self._x, self._y)
+        return end
 
 
 class MouseClickNetworkCommand(NetworkCommand):
 
     def __init__(self, socket_writer: SocketDataWriter, x: int, y: int, button: MouseButton, state: ButtonState):
-        packet = MouseClickPacketFactory.create_packet(x, y, button, state)
-        super().__init__(socket_writer, packet)
+        super().__init__(socket_writer)
+        self.set(x, y, button, state)
+
+    def set(self, x: int, y: int, button: MouseButton, state: ButtonState) -> None:
+        """
+        Reuses the command for another mouse click.
+        """
+        self._x = x
+        self._y = y
+        self._button = button
+        self._state = state
+
+    def write_into(self, buffer: bytearray, offset: int) -> int:
+        end = _reserve(buffer, offset + _MOUSE_CLICK_PACKET.size)
+        _MOUSE_CLICK_PACKET.pack_into(buffer, offset, PacketType.MOUSE_CLICK, self._button, self._state,
+                                      self._x, self._y)
+        return end
 
 
 class KeyboardEventNetworkCommand(NetworkCommand):
 
     def __init__(self, socket_writer: SocketDataWriter, key_code: str, state: ButtonState):
-        packet = KeyboardEventPacketFactory.create_packet(key_code, state)
-        super().__init__(socket_writer, packet)
+        super().__init__(socket_writer)
+        self.set(key_code, state)
+
+    def set(self, key_code: str, state: ButtonState) -> None:
+        """
+        Reuses the command for another keyboard event.
+        """
+        self._key = key_code.encode('utf-8')
+        self._state = state
+
+    def write_into(self, buffer: bytearray, offset: int) -> int:
+        key = self._key
+        key_offset = offset + _KEYBOARD_EVENT_HEADER.size
+        state_offset = key_offset + len(key)
+        end = _reserve(buffer, state_offset + 1)
+        _KEYBOARD_EVENT_HEADER.pack_into(buffer, offset, PacketType.KEYBOARD_EVENT, len(key))
+        buffer[key_offset:state_offset] = key
+        buffer[state_offset] = self._state
+        return end
 
 
 class MouseMoveCommand(Command):
@@ -60,8 +171,17 @@ class MouseMoveCommand(Command):
         self._mouse_move = mouse_move
 
     def execute(self, *args, **kwargs):
-        x = self._mouse_move.get_x()
-        y = self._mouse_move.get_y()
+        MouseMoveCommand.execute_direct(self._mouse_move)
+
+    @staticmethod
+    def execute_direct(mouse_move: MouseMoveData) -> None:
+        """
+        Executes the command for given data without creating command instance.
+        """
+        x = mouse_move.get_x()
+        y = mouse_move.get_y()
+        # Data object is not needed anymore, reuse it for next packets
+        mouse_move.release()
         try:
             pyautogui.moveTo(x, y)
         except pyautogui.FailSafeException:
@@ -74,8 +194,16 @@ class MouseClickCommand(Command):
         self._mouse_click = mouse_click
 
     def execute(self, *args, **kwargs):
-        x, y = self._mouse_click.get_x(), self._mouse_click.get_y()
-        state, button = self._mouse_click.get_state(), self._mouse_click.get_button()
+        MouseClickCommand.execute_direct(self._mouse_click)
+
+    @staticmethod
+    def execute_direct(mouse_click: MouseClickData) -> None:
+        """
+        Executes the command for given data without creating command instance.
+        """
+        x, y = mouse_click.get_x(), mouse_click.get_y()
+        state, button = mouse_click.get_state(), mouse_click.get_button()
+        mouse_click.release()
 
         if button == MouseButton.MIDDLE_WHEEL_UP:
             pyautogui.scroll(1, x, y)
@@ -94,8 +222,16 @@ class KeyboardEventCommand(Command):
         self._keyboard_event = keyboard_event
 
     def execute(self, *args, **kwargs):
-        state = self._keyboard_event.get_state()
-        key = self._keyboard_event.get_key()
+        KeyboardEventCommand.execute_direct(self._keyboard_event)
+
+    @staticmethod
+    def execute_direct(keyboard_event: KeyboardData) -> None:
+        """
+        Executes the command for given data without creating command instance.
+        """
+        state = keyboard_event.get_state()
+        key = keyboard_event.get_key()
+        keyboard_event.release()
         if state == ButtonState.PRESS:
             pyautogui.keyDown(key)
         elif state == ButtonState.RELEASE:
@@ -1,11 +1,20 @@
+import os
+import select
 import socket
+import tempfile
+import threading
 import time
 from abc import ABC
-from typing import Union
+from typing import Union, Tuple, Any, List
 
-from lock import AutoLockingValue
 from thread import Task
 
+# Non-blocking flag of a single recv call, not available on Windows
+_MSG_DONTWAIT = getattr(socket, "MSG_DONTWAIT", None)
+
+# Requested size of socket send and receive buffers, kernel may cap it
+SOCKET_BUFFER_SIZE = 4 * 1024 * 1024
+
 
 class NoDataAvailableError(Exception):
     """Custom exception class to represent no data being available to read."""
@@ -16,22 +25,36 @@ class NoConnection(Exception):
     pass
 
 
+def get_socket_address(host: str, port: int, unix_socket: bool) -> Tuple[int, Any]:
+    """
+    Returns socket family and address used for the given host and port.
+
+    When Unix domain socket is requested and the platform supports it, it is used instead
+    of TCP, which skips the whole TCP/IP stack. Host is ignored then, both peers have to
+    run on the same machine and read the same setting (see `constants.UNIX_SOCKET`).
+    Socket file path is derived from the port, so both peers resolve the same one.
+    """
+    if unix_socket and hasattr(socket, "AF_UNIX"):
+        return socket.AF_UNIX, os.path.join(tempfile.gettempdir(), f"rdp-{port}.sock")
+    return socket.AF_INET, (host, int(port))
+
+
 class Connection(Task, ABC):
 
-    def __init__(self) -> None:
+    def __init__(self, read_timeout: float = 0.5) -> None:
         super().__init__()
 
-        self.running = AutoLockingValue(False)
-        self.connected = AutoLockingValue(False)
+        self.connected = threading.Event()
         self.socket: Union[None, socket.socket] = None
+        self._read_timeout = read_timeout
 
     def write(self, data: bytes) -> None:
-        if self.running.getv():
-            if self.connected.getv():
+        if self.running.is_set():
+            if self.connected.is_set():
                 try:
                     self.socket.sendall(data)
                 except OSError as e:
-                    self.connected.setv(False)
+                    self.connected.clear()
                     print(f"sendall error {e}")
                     raise NoConnection(e)
                 return
@@ -40,26 +63,91 @@ class Connection(Task, ABC):
         else:
             raise RuntimeError("Connection stopped")
 
-    def read(self, bufsize: int) -> bytes:
-        if self.running.getv():
+    def writev(self, buffers: List[bytes]) -> None:
+        """
+        Writes all buffers with a single scatter-gather `sendmsg` call where available,
+        falling back to a joined `sendall` on platforms without `sendmsg`.
+        """
+        if self.running.is_set():
+            if self.connected.is_set():
+                try:
+                    if hasattr(self.socket, "sendmsg"):
+                        self._sendmsg_all(buffers)
+                    else:
+                        self.socket.sendall(b"".join(buffers))
+                except OSError as e:
+                    self.connected.clear()
+                    print(f"sendmsg error {e}")
+                    raise NoConnection(e)
+                return
+            else:
+                raise NoConnection("Connection is not established")
+        else:
+            raise RuntimeError("Connection stopped")
+
+    def _sendmsg_all(self, buffers: List[bytes]) -> None:
+        views = [memoryview(buffer).cast('B') for buffer in buffers]
+        while views:
+            sent = self.socket.sendmsg(views)
+            # Drop fully sent buffers and resend rest of partially sent one
+            while views and sent >= len(views[0]):
+                sent -= len(views.pop(0))
+            if sent:
+                views[0] = views[0][sent:]
+
+    def read_into(self, buffer: memoryview) -> int:
+        """
+        Reads data from the socket directly into the given buffer.
+
+        Already received data is read without waiting for the socket to become readable,
+        so a busy stream costs a single syscall per read instead of select and recv.
+
+        Returns:
+            int: The number of bytes read.
+        """
+        if self.running.is_set():
             try:
-                if self.connected.getv():
-                    data = self.socket.recv(bufsize)
-                    if data != b'':
-                        return data
+                if self.connected.is_set():
+                    size = self._recv_into_nowait(buffer)
+                    if size is None:
+                        # Do not block forever in recv, reader has to re-check running state
+                        readable, _, _ = select.select([self.socket], [], [], self._read_timeout)
+                        if not readable:
+                            raise NoDataAvailableError
+                        size = self.socket.recv_into(buffer)
+                    if size:
+                        return size
                     else:
                         # Socket closed by remote
                         raise OSError
                 else:
                     raise NoConnection("Connection is not established")
-            except OSError as e:
+            except (OSError, ValueError) as e:
                 # Can happen when remote host closed connection
-                self.connected.setv(False)
+                self.connected.clear()
                 print(f"recv error: {e}")
                 raise NoConnection(e)
         else:
             raise RuntimeError("Connection stopped")
 
+    def _recv_into_nowait(self, buffer: memoryview) -> Union[None, int]:
+        if _MSG_DONTWAIT is None:
+            return None
+        try:
+            return self.socket.recv_into(buffer, 0, _MSG_DONTWAIT)
+        except BlockingIOError:
+            return None
+
+    @staticmethod
+    def _set_buffer_sizes(sock: socket.socket):
+        # Whole video frames fit into socket buffers, sender is not throttled by small default windows
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+
+    def _set_nodelay(self):
+        # Packets are already batched per tick, do not delay small writes by Nagle's algorithm
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
     def stop(self):
         if self.socket:
             self.socket.close()
@@ -69,7 +157,16 @@ class Connection(Task, ABC):
         super().stop()
 
     def is_connected(self):
-        return self.connected.getv()
+        return self.connected.is_set()
+
+    def wait_connected(self, timeout: float) -> bool:
+        """
+        Blocks until the connection is established or the timeout expires.
+
+        Returns:
+            bool: True if the connection is established, False otherwise.
+        """
+        return self.connected.wait(timeout)
 
 
 class AutoReconnectServer(Connection):
@@ -82,9 +179,10 @@ class AutoReconnectServer(Connection):
         port (int): The server's port number.
         backlog (int): The maximum number of queued connections.
         retry_timeout (int): The time interval between connection attempts.
+        unix_socket (bool): Use Unix domain socket instead of TCP, client has to use it too.
     """
 
-    def __init__(self, host: str, port: int, backlog=1, retry_timeout=1):
+    def __init__(self, host: str, port: int, backlog=1, retry_timeout=1, unix_socket=False):
         super().__init__()
 
         self._host = host
@@ -92,31 +190,33 @@ class AutoReconnectServer(Connection):
         self._backlog = backlog
         self._retry_timeout = retry_timeout
         self._server_socket = None
+        self._family, self._address = get_socket_address(host, port, unix_socket)
 
     def run(self):
-        while self.running.getv():
-            if not self.connected.getv():
-                with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server_socket:
+        while self.running.is_set():
+            if not self.connected.is_set():
+                with socket.socket(self._family, socket.SOCK_STREAM) as server_socket:
 
-                    server_socket.bind((self._host, self._port))
+                    if self._family != socket.AF_INET and os.path.exists(self._address):
+                        # Remove socket file left by previous listener
+                        os.unlink(self._address)
+
+                    # Accepted socket inherits buffer sizes, they have to be set before listen
+                    self._set_buffer_sizes(server_socket)
+                    server_socket.bind(self._address)
                     server_socket.listen(self._backlog)
 
-                    print(f"Listening on {self._host}:{self._port}")
+                    print(f"Listening on {self._address}")
 
                     try:
                         self.socket, client_address = server_socket.accept()
 
-                        # enable keepalive option
-                        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
-
-                        # set the keepalive interval (in seconds)
-                        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 1)
-
-                        # set the number of keepalive probes
-                        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3)
-
-                        # set the interval between keepalive probes (in seconds)
-                        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 1)
+                        if self._family == socket.AF_INET:
+                            self._set_keepalive()
+                            self._set_nodelay()
+                        else:
+                            # Unix domain socket peers have no address
+                            client_address = self._address
 
                     except OSError as e:
                         self.socket = None
@@ -125,12 +225,32 @@ class AutoReconnectServer(Connection):
                         continue
 
                     # Pass all waiters for read and write calls
-                    self.connected.setv(True)
+                    self.connected.set()
 
                     print(f"Connection from {client_address}")
 
             time.sleep(0.25)
 
+    def stop(self):
+        super().stop()
+
+        if self._family != socket.AF_INET and os.path.exists(self._address):
+            # Do not leave socket file of stopped listener behind
+            os.unlink(self._address)
+
+    def _set_keepalive(self):
+        # enable keepalive option
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+
+        # set the keepalive interval (in seconds)
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 1)
+
+        # set the number of keepalive probes
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3)
+
+        # set the interval between keepalive probes (in seconds)
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 1)
+
 
 class AutoReconnectClient(Connection):
     """
@@ -141,23 +261,28 @@ class AutoReconnectClient(Connection):
         host (str): The server's hostname or IP address.
         port (int): The server's port number.
         retry_interval (int): The time interval between reconnection attempts.
+        unix_socket (bool): Use Unix domain socket instead of TCP, server has to use it too.
     """
 
-    def __init__(self, host: str, port: int, retry_timeout=1):
+    def __init__(self, host: str, port: int, retry_timeout=1, unix_socket=False):
         super().__init__()
         self._host = host
         self._port = port
         self._retry_timeout = retry_timeout
+        self._family, self._address = get_socket_address(host, port, unix_socket)
 
     def run(self):
-        while self.running.getv():
-            if not self.connected.getv():
+        while self.running.is_set():
+            if not self.connected.is_set():
                 try:
-                    print(f"Trying to connect to {self._host}:{self._port}")
-                    self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                    self.socket.connect((self._host, self._port))
-                    self.connected.setv(True)
-                    print(f"Connected to {self._host}:{self._port}")
+                    print(f"Trying to connect to {self._address}")
+                    self.socket = socket.socket(self._family, socket.SOCK_STREAM)
+                    self._set_buffer_sizes(self.socket)
+                    self.socket.connect(self._address)
+                    if self._family == socket.AF_INET:
+                        self._set_nodelay()
+                    self.connected.set()
+                    print(f"Connected to {self._address}")
                 except OSError as e:
                     print(f"Connect error: {e}")
                     print(f"Retrying in {self._retry_timeout} seconds...")
@@ -3,3 +3,11 @@ import os
 HOST = (os.getenv("RDP_SERVER_IP") or "127.0.0.1")
 PORT = (os.getenv("RDP_SERVER_PORT") or 8080)
 FPS = 30
+# Talk over Unix domain socket instead of TCP, both server and client have to run on the same machine
+# and read the same value, otherwise they never meet
+UNIX_SOCKET = os.getenv("RDP_UNIX_SOCKET") == "1"
+# CPU which services network interrupts, packet reader thread is pinned to it when set
+READER_CPU = int(os.getenv("RDP_READER_CPU")) if os.getenv("RDP_READER_CPU") else None
+# Interval of forced GIL switches between threads in seconds, threads mostly hand GIL over themselves
+# when blocking on sockets or events, so coarser interval only removes needless switches
+SWITCH_INTERVAL = 0.02
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Callable, Optional, Union, List, TypeVar, Type
 
 from enums import MouseButton, ButtonState
 from packet import Packet
@@ -13,13 +14,53 @@ class AbstractDataObject(ABC):
         pass
 
 
+P = TypeVar("P", bound="PooledDataObject")
+
+
+class PooledDataObject(AbstractDataObject, ABC):
+    """
+    A data object which is reused after release instead of being freed.
+
+    Every subclass has its own free list. `acquire` takes an object from it and
+    initializes it again, allocating a new one only when the list is empty.
+    Released object must not be used by the releasing code anymore.
+
+    Attributes:
+        _pool: Free list of released objects of the class.
+        _pool_size: Maximum number of kept released objects.
+    """
+    _pool: List["PooledDataObject"] = []
+    _pool_size = 256
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._pool = []
+
+    @classmethod
+    def acquire(cls: Type[P], *args) -> P:
+        try:
+            # list.pop is atomic, producer and consumer threads can acquire concurrently
+            data_object = cls._pool.pop()
+        except IndexError:
+            return cls(*args)
+        data_object.__init__(*args)
+        return data_object
+
+    def release(self) -> None:
+        pool = type(self)._pool
+        if len(pool) < self._pool_size:
+            pool.append(self)
+
+
 class VideoData(AbstractDataObject):
-    def __init__(self, width: int, height: int, encoder_type: int, frame_type: int, data: bytes):
+    def __init__(self, width: int, height: int, encoder_type: int, frame_type: int, data: Union[bytes, memoryview],
+                 release_callback: Optional[Callable[[], None]] = None):
         self._width = width
         self._height = height
         self._encoder_type = encoder_type
         self._frame_type = frame_type
         self._data = data
+        self._release_callback = release_callback
 
     def to_packet(self) -> Packet:
         return VideoContainerDataPacketFactory.create_packet(self._width, self._height, self._data)
@@ -36,11 +77,19 @@ class VideoData(AbstractDataObject):
     def get_frame_type(self) -> int:
         return self._frame_type
 
-    def get_data(self) -> bytes:
+    def get_data(self) -> Union[bytes, memoryview]:
         return self._data
 
+    def release(self) -> None:
+        """
+        Returns pooled data buffer back to its owner, data content must not be read afterwards.
+        """
+        if self._release_callback is not None:
+            self._release_callback()
+            self._release_callback = None
+
 
-class MouseMoveData(AbstractDataObject):
+class MouseMoveData(PooledDataObject):
     def __init__(self, x: int, y: int):
         self._x = x
         self._y = y
@@ -55,7 +104,7 @@ class MouseMoveData(AbstractDataObject):
         return self._y
 
 
-class MouseClickData(AbstractDataObject):
+class MouseClickData(PooledDataObject):
 
     def __init__(self, x: int, y: int, button: MouseButton, state: ButtonState) -> None:
         self._x = x
@@ -79,7 +128,7 @@ class MouseClickData(AbstractDataObject):
         return self._state
 
 
-class KeyboardData(AbstractDataObject):
+class KeyboardData(PooledDataObject):
     def __init__(self, key: str, state: ButtonState):
         self._key = key
         self._state = state
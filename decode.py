@@ -14,18 +14,31 @@ class AbstractDecoderStrategy(ABC):
     def decode_packet(self, video_data: MouseMoveData) -> List[bytes]:
         pass
 
+    @abstractmethod
+    def get_pixel_format(self) -> str:
+        """Returns the pygame pixel format of decoded frames, e.g. "RGB"."""
+        pass
+
 
 class DefaultDecoder:
+    # Frames are captured and encoded as packed 24-bit RGB
+    PIXEL_FORMAT = "RGB"
+
     class FrameType(IntEnum):
         FULL_FRAME = 0x01
         DIFF_FRAME = 0x02
 
     def __init__(self):
         self._last_frame: Union[None, cv2.UMat] = None
+        # Destination of diff frames, reused while frame size does not change
+        self._diff_frame: Union[None, cv2.UMat] = None
 
     def __str__(self):
         return f"DefaultDecoder()"
 
+    def get_pixel_format(self) -> str:
+        return DefaultDecoder.PIXEL_FORMAT
+
     def decode_packet(self, video_data: VideoData) -> List[np.ndarray]:
         width = video_data.get_width()
         height = video_data.get_height()
@@ -38,16 +51,18 @@ class DefaultDecoder:
             # TODO why is zlib.error happening and how to prevent it
             print(e)
             return [self._last_frame]
-        nframe = np.frombuffer(frame, dtype=np.uint8)
-        nframe = cv2.UMat(nframe.reshape((width, height, 3)))
+        # Array shares memory with decompressed bytes, no copy is made
+        nframe = np.frombuffer(frame, dtype=np.uint8).reshape((width, height, 3))
 
         if frame_type == DefaultDecoder.FrameType.FULL_FRAME:
-            self._last_frame = nframe
+            self._last_frame = cv2.UMat(nframe)
+            # Full frame is returned as is, downloading it back from UMat would copy it
+            return [nframe]
         elif frame_type == DefaultDecoder.FrameType.DIFF_FRAME and self._last_frame is not None:
-            nframe = cv2.add(self._last_frame, nframe)
+            self._diff_frame = cv2.add(self._last_frame, cv2.UMat(nframe), self._diff_frame)
+            return [self._diff_frame.get()]
         else:
             raise RuntimeError("invalid frame type or not previous frame available")
-        return [nframe.get()]
 
 
 class DecoderStrategyBuilder:
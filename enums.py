@@ -28,3 +28,9 @@ class ButtonState(IntEnum):
     """
     PRESS = 0x01
     RELEASE = 0x00
+
+
+# Enum members by value, calling the enum class on every packet is much slower than dict lookup
+PACKET_TYPES = {packet_type.value: packet_type for packet_type in PacketType}
+MOUSE_BUTTONS = {button.value: button for button in MouseButton}
+BUTTON_STATES = {state.value: state for state in ButtonState}
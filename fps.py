@@ -6,16 +6,19 @@ class FrameRateLimiter:
     """
     A simple class to sleep the thread based on the provided frames per second (FPS) value.
 
+    Ticks are scheduled on absolute deadlines, so a late wake up shortens the next sleep
+    instead of lowering the frame rate.
+
     Attributes:
         fps (float): The desired frames per second.
-        _last_tick (float): The time at which the last tick occurred.
+        _next_deadline (float): The time at which the next tick should occur.
         _sleep_duration (float): The duration to sleep between ticks.
     """
 
     def __init__(self, fps: float) -> None:
         self._fps = fps
-        self._last_tick = time.perf_counter()
         self._sleep_duration = 1 / self._fps
+        self._next_deadline = time.perf_counter() + self._sleep_duration
 
     def set_fps(self, fps: float) -> None:
         self._fps = fps
@@ -23,12 +26,15 @@ class FrameRateLimiter:
 
     def tick(self) -> None:
         current_time = time.perf_counter()
-        elapsed_time = current_time - self._last_tick
 
-        if elapsed_time < self._sleep_duration:
-            time.sleep(self._sleep_duration - elapsed_time)
+        if self._next_deadline > current_time:
+            time.sleep(self._next_deadline - current_time)
+            current_time = self._next_deadline
 
-        self._last_tick = time.perf_counter()
+        self._next_deadline += self._sleep_duration
+        if self._next_deadline < current_time:
+            # Do not try to catch up after a long stall, start a new schedule
+            self._next_deadline = current_time + self._sleep_duration
 
 
 class FrameRateCalculator:
@@ -1,11 +1,18 @@
 import io
 import struct
+from typing import Optional
 
 
 class Packet:
 
     def __init__(self) -> None:
         self.buffer = io.BytesIO()
+        # Serialized content, valid until the packet is modified
+        self._bytes: Optional[bytes] = None
+
+    def _write(self, data: bytes) -> None:
+        self._bytes = None
+        self.buffer.write(data)
 
     def add_int(self, value: int) -> None:
         """
@@ -14,7 +21,7 @@ class Packet:
         Args:
             value: The integer value to add to the buffer.
         """
-        self.buffer.write(struct.pack('>I', value))
+        self._write(struct.pack('>I', value))
 
     def add_string(self, value: str) -> None:
         """
@@ -26,7 +33,7 @@ class Packet:
         """
         encoded_value = value.encode('utf-8')
         self.add_int(len(encoded_value))
-        self.buffer.write(encoded_value)
+        self._write(encoded_value)
 
     def add_byte(self, value: int) -> None:
         """
@@ -35,7 +42,7 @@ class Packet:
         Args:
             value: The byte value to add to the buffer.
         """
-        self.buffer.write(struct.pack('B', value))
+        self._write(struct.pack('B', value))
 
     def add_boolean(self, value: bool) -> None:
         """
@@ -54,7 +61,7 @@ class Packet:
             value: The bytes value to add to the buffer.
         """
         self.add_int(len(value))
-        self.buffer.write(value)
+        self._write(value)
 
     def get_bytes(self) -> bytes:
         """
@@ -63,8 +70,11 @@ class Packet:
         Returns:
             A bytes object containing the contents of the buffer.
         """
-        return self.buffer.getvalue()
+        if self._bytes is None:
+            self._bytes = self.buffer.getvalue()
+        return self._bytes
 
     def clear(self) -> None:
         """Clear the packet buffer by creating a new empty buffer."""
         self.buffer = io.BytesIO()
+        self._bytes = None
@@ -1,20 +1,21 @@
-import queue
 import threading
 from abc import ABC, abstractmethod
 from queue import Queue
 from typing import Union, List, Any
 
+import pygame
+
 from capture import AbstractCaptureStrategy, CaptureStrategyBuilder
 from connection import NoConnection
-from dao import VideoContainerDataPacketFactory
 from decode import DecoderStrategyBuilder, AbstractDecoderStrategy
 from encode import AbstractEncoderStrategy, EncoderStrategyBuilder
-from enums import PacketType
 from fps import FrameRateLimiter
 from lock import AutoLockingValue
 from processor import PacketProcessor
 from pwrite import SocketDataWriter
+from ring import SPSCRing
 from thread import Task
+from utils import fit_to_window
 
 SLEEP_TIME = 1 / 120
 
@@ -127,9 +128,8 @@ class _StreamSenderComponent(Component):
         return f"SocketWriterComponent(width={self._width}, height={self._height})"
 
     def run(self, encoded_frame) -> None:
-        packet = VideoContainerDataPacketFactory.create_packet(self._width, self._height, encoded_frame)
         try:
-            self._socket_writer.write_packet(packet)
+            self._socket_writer.write_video_data(self._width, self._height, encoded_frame)
         except NoConnection:
             # Connection lost
             # We are discarding encoded data
@@ -154,7 +154,8 @@ class AbstractPipeline(Task, ABC):
 
     def __init__(self, fps: int):
         super().__init__()
-        self._queue_of_results = queue.Queue()
+        # Pipeline thread is the only producer and caller of pop_result the only consumer
+        self._queue_of_results = SPSCRing(64)
         self._frame_limiter = FrameRateLimiter(fps)
 
     @abstractmethod
@@ -162,13 +163,10 @@ class AbstractPipeline(Task, ABC):
         pass
 
     def pop_result(self) -> Any:
-        try:
-            return self._queue_of_results.get_nowait()
-        except queue.Empty:
-            return None
+        return self._queue_of_results.get_nowait()
 
     def run(self):
-        while self.running.getv():
+        while self.running.is_set():
             last_result = None
             pipe_passed = True
             for component in self.get_components():
@@ -179,7 +177,7 @@ class AbstractPipeline(Task, ABC):
                 else:
                     last_result = component_result
             if pipe_passed:
-                self._queue_of_results.put(last_result)
+                self._queue_of_results.put_nowait(last_result)
 
             # Limit pipeline throughput to fps
             self._frame_limiter.tick()
@@ -283,7 +281,7 @@ class _StreamReaderComponent(Component):
         return f"SocketReaderComponent()"
 
     def run(self, *args):
-        return self._stream_packet_processor.get_packet_data(PacketType.VIDEO_DATA)
+        return self._stream_packet_processor.get_video_data()
 
 
 class _DecoderComponent(Component):
@@ -314,7 +312,63 @@ class _DecoderComponent(Component):
 
     def run(self, video_data):
         if video_data:
-            return video_data, self._decoder_strategy.decode_packet(video_data)
+            try:
+                return video_data, self._decoder_strategy.decode_packet(video_data)
+            finally:
+                # Encoded frame is not needed after decode, reuse its buffer for next packets
+                video_data.release()
+        return None
+
+
+class _ScaleComponent(Component):
+    """
+    Component class for scaling decoded video frames to the window.
+
+    This class is a Component responsible for turning the last decoded frame into
+    a surface and scaling it into the window while preserving its aspect ratio,
+    so the rendering thread only has to blit it. Surfaces returned by the rendering
+    thread with `release_surface` are scaled into again instead of allocating new ones.
+
+    Attributes:
+        _window_size (AutoLockingValue): The thread-safe size of the window frames are scaled into.
+        _pixel_format (str): The pygame pixel format of decoded frames.
+        _free_surfaces (SPSCRing): Scaled surfaces which are no longer displayed.
+    """
+
+    def __init__(self, window_width: int, window_height: int, pixel_format: str):
+        super().__init__()
+
+        self._window_size = AutoLockingValue((window_width, window_height))
+        self._pixel_format = pixel_format
+        # Rendering thread is the only producer and pipeline thread the only consumer
+        self._free_surfaces = SPSCRing(4)
+
+    def __str__(self):
+        return f"ScaleComponent(window_size={self._window_size.getv()}, pixel_format={self._pixel_format})"
+
+    def set_window_size(self, window_width: int, window_height: int):
+        self._window_size.setv((window_width, window_height))
+
+    def release_surface(self, surface: pygame.Surface):
+        self._free_surfaces.put_nowait(surface)
+
+    def run(self, data):
+        if data:
+            video_data, frames = data
+            width = video_data.get_width()
+            height = video_data.get_height()
+            window_width, window_height = self._window_size.getv()
+            _, _, new_width, new_height = fit_to_window(width, height, window_width, window_height)
+
+            # Scale only last frame
+            image = pygame.image.frombuffer(frames[-1], (width, height), self._pixel_format)
+            scaled_size = (new_width, new_height)
+            surface = self._free_surfaces.get_nowait()
+            if surface is not None and surface.get_size() == scaled_size:
+                pygame.transform.scale(image, scaled_size, surface)
+            else:
+                surface = pygame.transform.scale(image, scaled_size)
+            return video_data, image, surface
         return None
 
 
@@ -323,19 +377,23 @@ class ReadDecodePipeline(AbstractPipeline):
     A pipeline for reading and decoding video data from a socket connection.
 
     This class is a concrete implementation of the AbstractPipeline that
-    reads video data from a socket connection and decodes it. It uses
-    _StreamReaderComponent and _DecoderComponent to perform these operations.
+    reads video data from a socket connection, decodes it and scales it to the window.
+    It uses _StreamReaderComponent, _DecoderComponent and _ScaleComponent to perform
+    these operations.
 
     Attributes:
         _socket_reader_component (_StreamReaderComponent): The component responsible for reading video data from a socket.
         _decoder_component (_DecoderComponent): The component responsible for decoding the video data.
+        _scale_component (_ScaleComponent): The component responsible for scaling decoded frames to the window.
     """
 
-    def __init__(self, fps: int, stream_packet_processor: PacketProcessor):
+    def __init__(self, fps: int, stream_packet_processor: PacketProcessor, window_width: int, window_height: int):
         super().__init__(fps)
 
         self._socket_reader_component = _StreamReaderComponent(stream_packet_processor)
-        self._decoder_component = _DecoderComponent(self._get_default_decoder_strategy())
+        decoder_strategy = self._get_default_decoder_strategy()
+        self._decoder_component = _DecoderComponent(decoder_strategy)
+        self._scale_component = _ScaleComponent(window_width, window_height, decoder_strategy.get_pixel_format())
 
     def get_socket_reader_component(self):
         return self._socket_reader_component
@@ -343,8 +401,11 @@ class ReadDecodePipeline(AbstractPipeline):
     def get_decoder_component(self):
         return self._decoder_component
 
+    def get_scale_component(self):
+        return self._scale_component
+
     def get_components(self):
-        return [self._socket_reader_component, self._decoder_component]
+        return [self._socket_reader_component, self._decoder_component, self._scale_component]
 
     @staticmethod
     def _get_default_decoder_strategy():
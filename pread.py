@@ -1,10 +1,33 @@
-import io
 import struct
-from typing import Tuple
+from typing import Tuple, Dict, Callable, Union, List
 
-from connection import Connection
-from dao import MouseMoveData, AbstractDataObject, VideoData, MouseClickData, KeyboardData
-from enums import PacketType, ButtonState, MouseButton
+from connection import Connection, NoDataAvailableError
+from dao import AbstractDataObject, VideoData, KeyboardData
+from enums import PacketType, PACKET_TYPES, MOUSE_BUTTONS, BUTTON_STATES
+
+# Precompiled formats, avoids format string lookup on every read
+_UINT = struct.Struct('>I')
+
+# Fixed layout parts of packets, read with a single unpack call
+_VIDEO_HEADER = struct.Struct('>IIIII')  # width, height, frame packet size, encoder type, frame type
+_MOUSE_MOVE = struct.Struct('>II')  # x, y
+_MOUSE_CLICK = struct.Struct('>BBII')  # button, state, x, y
+
+# Parsed packet content, mouse packets are kept as plain integer fields which are
+# queued as they are, other packets are parsed into data objects
+PacketData = Union[AbstractDataObject, Tuple[int, ...]]
+
+# Byte sequence of synchronization packet
+_SYNC_PACKET = b'\x00\x01\x00\x01\x00\x01\x00\x01'
+
+# Upper bound of a single socket read
+_MAX_READ_SIZE = 1024 * 1024
+
+# Default size of a single socket read, many small packets are received with one syscall
+_DEFAULT_READ_SIZE = 256 * 1024
+
+# Number of video frame buffers kept for reuse
+_FRAME_POOL_SIZE = 4
 
 
 class InvalidPacketType(Exception):
@@ -16,23 +39,41 @@ class InvalidPacketType(Exception):
         super().__init__(f"Unexpected packet type: {exception}")
 
 
+class InvalidPacketData(Exception):
+    """
+    Raised when fields of a packet hold unexpected values, e.g. an unknown mouse button.
+    """
+
+
 class BytesReader:
 
     def __init__(self, data: bytes):
-        self.buffer = io.BytesIO(data)
+        self.buffer = bytearray(data)
+        self.position = 0
 
     def read_int(self) -> int:
         """Read an integer from the buffer in big-endian format."""
-        return struct.unpack('>I', self.buffer.read(4))[0]
+        value = _UINT.unpack_from(self.buffer, self.position)[0]
+        self.position += 4
+        return value
+
+    def read_struct(self, fmt: struct.Struct) -> tuple:
+        """Read consecutive fixed size fields described by a precompiled struct format."""
+        values = fmt.unpack_from(self.buffer, self.position)
+        self.position += fmt.size
+        return values
 
     def read_string(self, length: int) -> str:
         """Read a string from the buffer by first reading its length, then reading the UTF-8 encoded string."""
-        encoded_value = self.buffer.read(length)
+        encoded_value = self.buffer[self.position:self.position + length]
+        self.position += length
         return encoded_value.decode('utf-8')
 
     def read_byte(self) -> int:
         """Read a byte from the buffer."""
-        return struct.unpack('B', self.buffer.read(1))[0]
+        value = self.buffer[self.position]
+        self.position += 1
+        return value
 
     def read_boolean(self) -> bool:
         """Read a boolean value from the buffer as a single byte (1 for True, 0 for False)."""
@@ -40,18 +81,43 @@ class BytesReader:
 
     def read_bytes(self, length: int) -> bytes:
         """Read raw bytes from the buffer, prefixed with the length of the bytes as an integer."""
-        return self.buffer.read(length)
+        value = bytes(memoryview(self.buffer)[self.position:self.position + length])
+        self.position += length
+        return value
 
 
 class SocketDataReader(BytesReader):
-    def __init__(self, connection: Connection, buffer_size: int = 256):
+    def __init__(self, connection: Connection, buffer_size: int = _DEFAULT_READ_SIZE):
         super().__init__(b"")  # Initialize BytesReader with empty bytes
-        self._buffer_size = buffer_size
+        self._buffer_size = min(buffer_size, _MAX_READ_SIZE)
+        # Socket reads land in a preallocated buffer instead of a new bytes object per read
+        self._recv_buffer = memoryview(bytearray(_MAX_READ_SIZE))
         self._connection = connection
+        self._buffered_only = False
+        self._frame_pool: List[bytearray] = []
+
+    # Hot reads check buffered size inline, the socket is touched only when data is missing
+
+    def wait_for_connection(self, timeout: float) -> bool:
+        """
+        Blocks until the underlying connection is established or the timeout expires.
+        """
+        return self._connection.wait_connected(timeout)
 
     def read_int(self) -> int:
-        self._ensure_data(4)
-        return super().read_int()
+        position = self.position
+        if len(self.buffer) - position < 4:
+            self._ensure_data(4)
+        self.position = position + 4
+        return _UINT.unpack_from(self.buffer, position)[0]
+
+    def read_struct(self, fmt: struct.Struct) -> tuple:
+        position = self.position
+        size = fmt.size
+        if len(self.buffer) - position < size:
+            self._ensure_data(size)
+        self.position = position + size
+        return fmt.unpack_from(self.buffer, position)
 
     def read_string(self, **kwargs) -> str:
         self._ensure_data(4)  # Length of the string
@@ -60,8 +126,11 @@ class SocketDataReader(BytesReader):
         return super().read_string(length)
 
     def read_byte(self) -> int:
-        self._ensure_data(1)
-        return super().read_byte()
+        position = self.position
+        if len(self.buffer) == position:
+            self._ensure_data(1)
+        self.position = position + 1
+        return self.buffer[position]
 
     def read_boolean(self) -> bool:
         self._ensure_data(1)
@@ -73,107 +142,197 @@ class SocketDataReader(BytesReader):
         self._ensure_data(length)
         return super().read_bytes(length)
 
+    def read_pooled_bytes(self) -> Tuple[memoryview, Callable[[], None]]:
+        """
+        Reads length prefixed bytes into a reusable buffer taken from the frame pool.
+
+        Returns:
+            View of the read bytes and a callable which returns the buffer back to the pool.
+            The view must not be used after the buffer is returned.
+        """
+        self._ensure_data(4)  # Length of the bytes
+        length = super().read_int()
+        self._ensure_data(length)
+
+        try:
+            frame_buffer = self._frame_pool.pop()
+        except IndexError:
+            frame_buffer = bytearray(length)
+        if len(frame_buffer) < length:
+            frame_buffer = bytearray(length)
+
+        view = memoryview(frame_buffer)[:length]
+        view[:] = memoryview(self.buffer)[self.position:self.position + length]
+        self.position += length
+        return view, lambda: self._release_frame_buffer(frame_buffer)
+
+    def _release_frame_buffer(self, frame_buffer: bytearray):
+        if len(self._frame_pool) < _FRAME_POOL_SIZE:
+            self._frame_pool.append(frame_buffer)
+
     def _flush_read_data(self):
         """
         Flushes read data from the buffer by discarding the data read so far
         and leaving only the unread data in the buffer.
         """
-        remaining_data = self.buffer.getvalue()[self.buffer.tell():]
-        self.buffer = io.BytesIO()
-        self.buffer.write(remaining_data)
-        self.buffer.seek(0)
+        del self.buffer[:self.position]
+        self.position = 0
 
     def _ensure_data(self, size: int):
         """
         Ensures that the buffer has at least `size` bytes of data.
         """
-        while (self.buffer.getbuffer().nbytes - self.buffer.tell()) < size:
-            self._fill_buffer()
+        while (missing := size - (len(self.buffer) - self.position)) > 0:
+            if self._buffered_only:
+                raise NoDataAvailableError
+            self._fill_buffer(missing)
 
-    def _fill_buffer(self):
+    def _fill_buffer(self, size: int = 0):
         """
         Reads data from the socket and appends it to the buffer.
+        Large payloads are requested at once instead of in `_buffer_size` chunks.
         Raises a ConnectionError if the connection is closed.
         """
-        data = self._connection.read(self._buffer_size)
-
-        current_pos = self.buffer.tell()
-        self.buffer.seek(0, io.SEEK_END)
-        self.buffer.write(data)
-        self.buffer.seek(current_pos)
+        recv_buffer = self._recv_buffer
+        read_size = self._connection.read_into(recv_buffer[:min(max(self._buffer_size, size), _MAX_READ_SIZE)])
+        self.buffer += recv_buffer[:read_size]
 
     def _seek_to_end_of_sync_packet(self) -> bool:
         """
-        Searches for the synchronization packet bytes in the buffer and seeks
-        to the position just after the end of the synchronization packet if found.
+        Searches for the synchronization packet bytes in the unread part of the buffer
+        and seeks to the position just after the end of the synchronization packet if found.
 
         The synchronization packet bytes are represented by the byte sequence
         '\x00\x01\x00\x01\x00\x01\x00\x01'.
 
         Returns:
             bool: True if the synchronization packet bytes are found in the buffer,
-                  False otherwise.
+                  False otherwise. When not found, the searched data is marked as read,
+                  except for a tail which may be the beginning of a synchronization packet.
         """
-
-        sync_packet_bytes = b'\x00\x01\x00\x01\x00\x01\x00\x01'
-        content = self.buffer.getvalue()
-
-        sync_packet_position = content.find(sync_packet_bytes)
+        sync_packet_position = self.buffer.find(_SYNC_PACKET, self.position)
 
         if sync_packet_position != -1:
-            self.buffer.seek(sync_packet_position + len(sync_packet_bytes))
+            self.position = sync_packet_position + len(_SYNC_PACKET)
             return True
         else:
+            self.position = max(self.position, len(self.buffer) - len(_SYNC_PACKET) + 1)
             return False
 
-    def read_packet(self) -> Tuple[PacketType, AbstractDataObject]:
+    def _resync(self, position: int):
+        """
+        Discards data from the position up to the end of the next synchronization packet.
+        """
+        self.position = position
+        while not self._seek_to_end_of_sync_packet():
+            self._flush_read_data()
+            self._ensure_data(len(_SYNC_PACKET))
+
+    def read_packet(self) -> Tuple[PacketType, PacketData]:
         while True:
+            packet_start = self.position
             try:
-                packet_type = PacketType(self.read_byte())
-            except ValueError:
-                # Synchronization error
-                while not self._seek_to_end_of_sync_packet():
-                    self._flush_read_data()
-                    self._ensure_data(self._buffer_size)
+                packet_type = PACKET_TYPES[self.read_byte()]
+            except KeyError:
+                # Synchronization error, search from the unexpected byte
+                self._resync(packet_start)
                 continue
 
             try:
-                if packet_type == PacketType.VIDEO_DATA:
-                    width = self.read_int()
-                    height = self.read_int()
-                    frame_packet = self.read_bytes()
+                try:
+                    parser = _PARSERS[packet_type]
+                except KeyError:
+                    raise NotImplementedError
+                return packet_type, parser(self)
+
+            except InvalidPacketData:
+                # Corrupted packet is dropped like an unknown packet type, search after its type byte
+                self._resync(packet_start + 1)
+                continue
+
+            except NoDataAvailableError:
+                # Packet is not complete yet, rewind so it is parsed again once the rest arrives
+                self.position = packet_start
+                raise
+
+            finally:
+                self._flush_read_data()
+
+    def read_packet_nowait(self) -> Union[None, Tuple[PacketType, PacketData]]:
+        """
+        Reads the next packet only from data which is already buffered, the socket is not touched.
 
-                    # Seek to the start of frame packet, -4 represents byte array size
-                    self.buffer.seek(self.buffer.tell() - len(frame_packet))
+        Returns:
+            The packet type and packet data, or None if the buffer does not hold a complete packet.
+        """
+        if len(self.buffer) == self.position:
+            return None
+
+        self._buffered_only = True
+        try:
+            return self.read_packet()
+        except NoDataAvailableError:
+            return None
+        finally:
+            self._buffered_only = False
+
+    def read_packets_available(self, max_n: int = 64) -> List[Tuple[PacketType, PacketData]]:
+        """
+        Blocks until the next packet is read, then adds packets which are already buffered,
+        so a single socket read can yield many packets.
 
-                    encoder_type = self.read_int()
-                    frame_type = self.read_int()
-                    encoded_frame = self.read_bytes()
+        Args:
+            max_n: Maximum number of returned packets.
 
-                    return packet_type, VideoData(width, height, encoder_type, frame_type, encoded_frame)
+        Returns:
+            List of packet types and packet data in stream order.
+        """
+        packets = [self.read_packet()]
+        while len(packets) < max_n:
+            packet = self.read_packet_nowait()
+            if packet is None:
+                break
+            packets.append(packet)
+        return packets
 
-                elif packet_type == PacketType.MOUSE_MOVE:
-                    x = self.read_int()
-                    y = self.read_int()
 
-                    return packet_type, MouseMoveData(x, y)
+def _parse_video_data(reader: SocketDataReader) -> VideoData:
+    # Frame packet is nested in video packet, its size prefix is skipped
+    width, height, _, encoder_type, frame_type = reader.read_struct(_VIDEO_HEADER)
+    encoded_frame, release = reader.read_pooled_bytes()
 
-                elif packet_type == PacketType.MOUSE_CLICK:
-                    button = MouseButton(self.read_byte())
-                    state = ButtonState(self.read_byte())
-                    x = self.read_int()
-                    y = self.read_int()
+    return VideoData(width, height, encoder_type, frame_type, encoded_frame, release)
 
-                    return packet_type, MouseClickData(x, y, button, state)
 
-                elif packet_type == PacketType.KEYBOARD_EVENT:
-                    key_code = self.read_string()
-                    state = ButtonState(self.read_byte())
+def _parse_mouse_move(reader: SocketDataReader) -> Tuple[int, int]:
+    # x, y
+    return reader.read_struct(_MOUSE_MOVE)
 
-                    return packet_type, KeyboardData(key_code, state)
 
-                else:
-                    raise NotImplementedError
+def _parse_mouse_click(reader: SocketDataReader) -> Tuple[int, int, int, int]:
+    # button, state, x, y, enums are looked up only when the click is consumed
+    fields = reader.read_struct(_MOUSE_CLICK)
+    if fields[0] not in MOUSE_BUTTONS or fields[1] not in BUTTON_STATES:
+        raise InvalidPacketData(f"Unexpected mouse click fields: {fields}")
 
-            finally:
-                self._flush_read_data()
+    return fields
+
+
+def _parse_keyboard_event(reader: SocketDataReader) -> KeyboardData:
+    try:
+        key_code = reader.read_string()
+    except UnicodeDecodeError as e:
+        raise InvalidPacketData(f"Unexpected key code: {e}")
+    state = BUTTON_STATES.get(reader.read_byte())
+    if state is None:
+        raise InvalidPacketData("Unexpected key state")
+
+    return KeyboardData.acquire(key_code, state)
+
+
+_PARSERS: Dict[PacketType, Callable[[SocketDataReader], PacketData]] = {
+    PacketType.VIDEO_DATA: _parse_video_data,
+    PacketType.MOUSE_MOVE: _parse_mouse_move,
+    PacketType.MOUSE_CLICK: _parse_mouse_click,
+    PacketType.KEYBOARD_EVENT: _parse_keyboard_event,
+}
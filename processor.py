@@ -1,74 +1,143 @@
-import queue
-import time
-from queue import Queue
-from typing import Dict, Union, Type
+import os
+import threading
+from typing import Tuple, List, Optional, Callable, Any, Dict
 
-from command import MouseMoveCommand, MouseClickCommand, KeyboardEventCommand, Command
+from command import MouseMoveCommand, MouseClickCommand, KeyboardEventCommand
 from connection import NoDataAvailableError, NoConnection
-from dao import MouseMoveData, MouseClickData, KeyboardData
-from enums import PacketType
-from lock import AutoLockingValue
-from pread import SocketDataReader
+from dao import MouseMoveData, MouseClickData, VideoData
+from enums import PacketType, MOUSE_BUTTONS, BUTTON_STATES
+from pread import SocketDataReader, PacketData
+from ring import SPSCRing
 from thread import Task
 
 
 class PacketProcessor(Task):
 
-    def __init__(self, reader: SocketDataReader):
+    def __init__(self, reader: SocketDataReader, cpu: Optional[int] = None):
         super().__init__()
 
         self._socket_data_reader = reader
-        self._packet_queues: AutoLockingValue[Dict[PacketType, Queue]] = (
-            AutoLockingValue({ptype: Queue() for ptype in PacketType})
-        )
+        # CPU the reader thread is pinned to, socket data stays in its caches
+        self._cpu = cpu
+        # Single producer (run) and single consumer per queue,
+        # lock-free ring drops oldest packets when consumer falls behind.
+        self._video_queue: SPSCRing[VideoData] = SPSCRing(1024)
+        # Input packets of all types share one queue, so they are executed in the order they were sent,
+        # e.g. a mouse button is pressed at the position of the move sent before it
+        self._input_queue: SPSCRing[Tuple[PacketType, PacketData]] = SPSCRing(1024)
 
-    def get_packet_data(self, packet_type: PacketType) -> Union[None, MouseMoveData, MouseClickData, KeyboardData]:
-        try:
-            return self._packet_queues.get(packet_type).get_nowait()
-        except queue.Empty:
-            return None
+        # Set whenever new input packets are queued, cleared by the waiting consumer.
+        # Video packets do not set it, the command thread is not woken for every frame.
+        self._input_available = threading.Event()
+
+    def get_video_data(self) -> Optional[VideoData]:
+        return self._video_queue.get_nowait()
+
+    def get_input_packets(self) -> List[Tuple[PacketType, PacketData]]:
+        """
+        Returns all queued input packets in stream order and removes them from the queue.
+        """
+        packets = []
+        append = packets.append
+        get_nowait = self._input_queue.get_nowait
+        while (packet := get_nowait()) is not None:
+            append(packet)
+        return packets
+
+    def wait_for_input_packets(self, timeout: float) -> None:
+        """
+        Blocks until an input packet is queued or the timeout expires.
+
+        Meant for a single waiting consumer thread, as the wake-up event is cleared here.
+        """
+        # Clear before checking queue, so packets queued after the check set event again
+        self._input_available.clear()
+        if not len(self._input_queue):
+            self._input_available.wait(timeout)
 
     def run(self):
-        while self.running.getv():
+        # Affinity is set per thread, pid 0 means calling thread on Linux
+        if self._cpu is not None and hasattr(os, "sched_setaffinity"):
             try:
-                packet_type, data_object = self._socket_data_reader.read_packet()
-                try:
-                    self._packet_queues.get(packet_type).put_nowait(data_object)
-                except queue.Full:
-                    pass
+                os.sched_setaffinity(0, {self._cpu})
+            except OSError as e:
+                print(f"Could not pin packet reader to CPU {self._cpu}: {e}")
+
+        # Resolve attribute and method lookups once, loop below runs for every received batch
+        VIDEO_DATA = PacketType.VIDEO_DATA
+        put_video = self._video_queue.put_nowait
+        put_input = self._input_queue.put_nowait
+        read_packets_available = self._socket_data_reader.read_packets_available
+        input_available = self._input_available
+        is_running = self.running.is_set
+        while is_running():
+            try:
+                input_queued = False
+                for packet in read_packets_available():
+                    if packet[0] == VIDEO_DATA:
+                        put_video(packet[1])
+                    else:
+                        put_input(packet)
+                        input_queued = True
+
+                # Wake consumer only when it may be waiting, setting an already set event is wasted work
+                if input_queued and not input_available.is_set():
+                    input_available.set()
             except NoConnection:
-                # There is connection lost
-                time.sleep(0.01)
+                # There is connection lost, sleep until it is established again
+                self._socket_data_reader.wait_for_connection(timeout=0.5)
             except NoDataAvailableError:
-                # There are no packets in stream available
-                time.sleep(0.01)
+                # Read timed out, re-check running state
+                pass
             except RuntimeError:
                 # Application shutdown
                 pass
 
 
+def _execute_mouse_move(fields: Tuple[int, int]) -> None:
+    MouseMoveCommand.execute_direct(MouseMoveData.acquire(*fields))
+
+
+def _execute_mouse_click(fields: Tuple[int, int, int, int]) -> None:
+    button, state, x, y = fields
+    MouseClickCommand.execute_direct(MouseClickData.acquire(x, y, MOUSE_BUTTONS[button], BUTTON_STATES[state]))
+
+
 class CommandProcessor(Task):
 
     def __init__(self, packet_processor: PacketProcessor):
         super().__init__()
         self._packet_processor = packet_processor
+        # Actions executing data of input packets by packet type, no command instance is created per packet.
+        # Mouse packets are plain integer fields, data objects are created only when executed.
+        self._execute: Dict[PacketType, Callable[[Any], None]] = {
+            PacketType.MOUSE_MOVE: _execute_mouse_move,
+            PacketType.MOUSE_CLICK: _execute_mouse_click,
+            PacketType.KEYBOARD_EVENT: KeyboardEventCommand.execute_direct,
+        }
 
     def __str__(self) -> str:
         return f"CommandExecutor()"
 
+    def execute_input_packets(self) -> None:
+        """
+        Executes all queued input packets in the order they were sent.
+
+        Mouse moves carry absolute position, so of consecutive moves only the last one is executed.
+        A move followed by any other packet is always executed, e.g. to press a button at its position.
+        """
+        packets = self._packet_processor.get_input_packets()
+        execute = self._execute
+        MOUSE_MOVE = PacketType.MOUSE_MOVE
+        last = len(packets) - 1
+        for i, (packet_type, packet_data) in enumerate(packets):
+            if packet_type == MOUSE_MOVE and i < last and packets[i + 1][0] == MOUSE_MOVE:
+                continue
+            execute[packet_type](packet_data)
+
     def run(self):
-        while self.running.getv():
-            time.sleep(0.0025)
-
-            self._process_all(PacketType.MOUSE_MOVE, MouseMoveCommand)
-            self._process_all(PacketType.MOUSE_CLICK, MouseClickCommand)
-            self._process_all(PacketType.KEYBOARD_EVENT, KeyboardEventCommand)
-
-    def _process_all(self, packets: PacketType, and_resolve_with_command: Type[Command]):
-        while True:
-            data_object = self._packet_processor.get_packet_data(packets)
-            if data_object:
-                cmd = and_resolve_with_command(data_object)
-                cmd.execute()
-            else:
-                break
+        while self.running.is_set():
+            self.execute_input_packets()
+
+            # Sleep until new input packets arrive, timeout re-checks running state
+            self._packet_processor.wait_for_input_packets(timeout=0.5)
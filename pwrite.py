@@ -1,27 +1,74 @@
+import threading
 import time
+from struct import Struct
+from typing import Union
 
-from connection import Connection
-from packet import Packet
+from connection import Connection, NoConnection
+from enums import PacketType
 from pfactory import SynchronizationPacketFactory
+from thread import Task
 
+# Packet type, width, height and data length of video container packet
+_VIDEO_HEADER = Struct('>BIII')
 
-class SocketDataWriter:
+
+class SocketDataWriter(Task):
     """
     A class for writing data packets to a socket connection.
 
+    Synchronization packets are written by the writer's own thread every
+    `sync_packet_timeout` seconds, so write methods only write their payload.
+    All writes are serialized by a lock, packets are never interleaved.
+
     Attributes:
         _connection (Connection): The connection object for the socket.
+        _sync_packet_timeout (float): Interval between synchronization packets in seconds.
+        _sync_bytes (bytes): Serialized synchronization packet, its content never changes.
+        _write_lock (threading.Lock): Lock serializing writes of all threads.
     """
 
     def __init__(self, connection: Connection, sync_packet_timeout=0.5):
+        super().__init__()
         self._connection = connection
         self._sync_packet_timeout = sync_packet_timeout
-        self._last_sync_packet = time.time()
+        self._sync_bytes = SynchronizationPacketFactory.create_packet().get_bytes()
+        self._write_lock = threading.Lock()
+
+    def __str__(self) -> str:
+        return f"SocketDataWriter(sync_packet_timeout={self._sync_packet_timeout})"
+
+    def run(self):
+        # Write synchronization packet into stream periodically
+        while self.running.is_set():
+            time.sleep(self._sync_packet_timeout)
+            try:
+                with self._write_lock:
+                    self._connection.write(self._sync_bytes)
+            except NoConnection:
+                # There is no connection, nothing to synchronize
+                pass
+            except RuntimeError:
+                # Application shutdown
+                pass
+
+    def write_bytes(self, data: Union[bytes, bytearray, memoryview]) -> None:
+        """
+        Writes already serialized packets.
+        """
+        with self._write_lock:
+            self._connection.write(data)
 
-    def write_packet(self, packet: Packet) -> None:
-        # Write synchronization packet into stream
-        if time.time() - self._last_sync_packet > self._sync_packet_timeout:
-            self._last_sync_packet = time.time()
-            self._connection.write(SynchronizationPacketFactory.create_packet().get_bytes())
+    def write_video_data(self, width: int, height: int, data: bytes) -> None:
+        """
+        Writes the same video container packet as `VideoContainerDataPacketFactory`, but sends
+        encoded data as a separate buffer of one scatter-gather write, so it is never copied
+        into an intermediate packet buffer.
 
-        self._connection.write(packet.get_bytes())
+        Args:
+            width: The width of video frame/s encoded in data
+            height: The height of video frame/s encoded in data
+            data: The encoded video data.
+        """
+        header = _VIDEO_HEADER.pack(PacketType.VIDEO_DATA, width, height, len(data))
+        with self._write_lock:
+            self._connection.writev([header, data])
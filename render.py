@@ -1,11 +1,36 @@
 import time
 from abc import ABC, abstractmethod
-from typing import List, Tuple, Optional, Callable, Type, TypeVar
+from typing import List, Tuple, Optional, Callable, Type, TypeVar, Dict
 
 import pygame
 
 T = TypeVar("T")
 
+# Default fonts by size, loading font from file is slow
+_FONTS: Dict[int, pygame.font.Font] = {}
+
+# Rendered text surfaces by font, text and color, rasterizing text is slow
+_TEXT_SURFACES: Dict[Tuple[pygame.font.Font, str, Tuple[int, int, int]], pygame.Surface] = {}
+_TEXT_SURFACES_MAX_SIZE = 256
+
+
+def _get_font(font_size: int) -> pygame.font.Font:
+    font = _FONTS.get(font_size)
+    if font is None:
+        font = _FONTS[font_size] = pygame.font.Font(None, font_size)
+    return font
+
+
+def _render_text(font: pygame.font.Font, text: str, color: Tuple[int, int, int]) -> pygame.Surface:
+    key = (font, text, color)
+    surface = _TEXT_SURFACES.get(key)
+    if surface is None:
+        # Texts like FPS change all the time, do not keep all of them
+        if len(_TEXT_SURFACES) >= _TEXT_SURFACES_MAX_SIZE:
+            _TEXT_SURFACES.clear()
+        surface = _TEXT_SURFACES[key] = font.render(text, True, color)
+    return surface
+
 
 class Layout(ABC):
 
@@ -38,15 +63,21 @@ class TextLayout(Layout):
                  position: Tuple[int, int] = (0, 0)):
         self._text = text
         self._font_size = font_size
-        self._font = font or pygame.font.Font(None, font_size)
+        self._font = font or _get_font(font_size)
         self._color = color
-        self._surface = self._font.render(self._text, True, self._color)
+        self._surface = _render_text(self._font, self._text, self._color)
 
         super().__init__(position, (self._surface.get_width(), self._surface.get_height()))
 
+    def set_text(self, text: str):
+        if text != self._text:
+            self._text = text
+            self._prerender()
+        return self
+
     def set_font_size(self, font_size: int):
         self._font_size = font_size
-        self._font = pygame.font.Font(None, font_size)
+        self._font = _get_font(font_size)
         self._prerender()
         return self
 
@@ -59,7 +90,7 @@ class TextLayout(Layout):
         screen.blit(self._surface, self.position)
 
     def _prerender(self):
-        self._surface = self._font.render(self._text, True, self._color)
+        self._surface = _render_text(self._font, self._text, self._color)
         self.size = self._surface.get_width(), self._surface.get_height()
 
 
@@ -236,7 +267,7 @@ class ThreeDotsTextLayout(TextLayout):
             ThreeDotsTextLayout._dots += "."
             if len(ThreeDotsTextLayout._dots) > 3:
                 ThreeDotsTextLayout._dots = ""
-        self._surface = self._font.render(f"{self._text}{ThreeDotsTextLayout._dots}", True, self._color)
+        self._surface = _render_text(self._font, f"{self._text}{ThreeDotsTextLayout._dots}", self._color)
         super().render(screen)
 
 
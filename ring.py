@@ -0,0 +1,47 @@
+from collections import deque
+from typing import TypeVar, Generic, Optional, Deque
+
+T = TypeVar("T")
+
+
+class SPSCRing(Generic[T]):
+    """
+    A bounded lock-free queue for one producer and one consumer thread.
+
+    Items are kept in a `collections.deque` with a maximum length. Its `append`
+    and `popleft` are implemented in C and atomic under the GIL, so no Python
+    level lock or condition is needed. When the ring is full, the oldest item
+    is dropped, so the consumer always gets the most recent data.
+
+    Example usage:
+
+        ring = SPSCRing(1024)
+
+        # Producer thread
+        ring.put_nowait(item)
+
+        # Consumer thread
+        item = ring.get_nowait()  # None if the ring is empty
+
+    Attributes:
+        _buffer: Deque holding queued items.
+    """
+
+    def __init__(self, size: int = 1024):
+        if size <= 0:
+            raise ValueError(f"Ring size has to be positive: {size}")
+
+        self._buffer: Deque[T] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def put_nowait(self, item: T) -> bool:
+        self._buffer.append(item)
+        return True
+
+    def get_nowait(self) -> Optional[T]:
+        try:
+            return self._buffer.popleft()
+        except IndexError:
+            return None
@@ -1,11 +1,13 @@
-from typing import Tuple
+import sys
+from typing import List, Tuple
 
 import pygame
 
 from bandwidth import BandwidthMonitor
-from command import MouseMoveNetworkCommand, MouseClickNetworkCommand, KeyboardEventNetworkCommand
+from command import MouseMoveNetworkCommand, MouseClickNetworkCommand, KeyboardEventNetworkCommand, \
+    NetworkBatchCommand
 from connection import AutoReconnectServer
-from constants import HOST, PORT, FPS
+from constants import HOST, PORT, FPS, READER_CPU, SWITCH_INTERVAL, UNIX_SOCKET
 from enums import MouseButton, ButtonState
 from fps import FrameRateCalculator
 from keyboard import KEY_MAPPING
@@ -15,6 +17,25 @@ from pread import SocketDataReader
 from processor import PacketProcessor
 from pwrite import SocketDataWriter
 from render import FlexboxLayout, TextLayout, ThreeDotsTextLayout
+from utils import fit_to_window
+
+# Interval of FPS texts updates in milliseconds
+HUD_UPDATE_INTERVAL = 250
+
+# Rate of input handling loop, window is redrawn only when its content changes
+INPUT_FPS = 120
+
+# Event types handled by server, all other events are blocked and never queued
+_HANDLED_EVENTS = (pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.KEYDOWN, pygame.KEYUP,
+                   pygame.VIDEORESIZE, pygame.QUIT)
+
+# Supported pygame mouse buttons
+_MOUSE_BUTTONS = {
+    pygame.BUTTON_LEFT: MouseButton.LEFT,
+    pygame.BUTTON_RIGHT: MouseButton.RIGHT,
+    pygame.BUTTON_WHEELUP: MouseButton.MIDDLE_WHEEL_UP,
+    pygame.BUTTON_WHEELDOWN: MouseButton.MIDDLE_WHEEL_DOWN,
+}
 
 
 class Server:
@@ -40,6 +61,11 @@ class Server:
         _bandwidth_monitor (BandwidthMonitor): A bandwidth monitor object to track bandwidth usage.
         _bandwidth_state_machine (BandwidthStateMachine): A state machine to manage bandwidth states.
         _read_decode_pipeline (ReadDecodePipeline): The pipeline object for processing the video stream.
+        _last_frame_image (pygame.Surface): The last received frame in client resolution.
+        _last_image (pygame.Surface): The last received frame scaled to the window.
+        _last_scaled_image (pygame.Surface): The last frame scaled by the pipeline, returned to it once replaced.
+        _resized_image (pygame.Surface): Reused surface for frames rescaled after the window was resized.
+        _event_handlers (dict): Handlers of pygame events by event type.
     """
 
     def __init__(self,
@@ -60,206 +86,357 @@ class Server:
         self._scaled_height = None
         self._x_offset = None
         self._y_offset = None
+        # Window to client coordinates mapping, updated with offsets
+        self._x_scale = None
+        self._y_scale = None
+        self._x_max = None
+        self._y_max = None
+        # Set once all sizes above are known, input events can be sent since then
+        self._sizes_ready = False
+        # Window and client sizes the sizes above were calculated for
+        self._last_layout_key = None
+        # Window areas not covered by the frame
+        self._letterbox_rects = ()
         self._fps = fps
         self._caption = caption
+        self._last_frame_image = None
         self._last_image = None
+        self._last_scaled_image = None
+        self._resized_image = None
 
         self._running = False
-        self._connection = AutoReconnectServer(host, port)
-        self._socket_reader = SocketDataReader(self._connection, buffer_size=4096)
+        self._connection = AutoReconnectServer(host, port, unix_socket=UNIX_SOCKET)
+        self._socket_reader = SocketDataReader(self._connection)
         self._socket_writer = SocketDataWriter(self._connection)
-        self._packet_processor = PacketProcessor(self._socket_reader)
-        self._read_decode_pipeline = ReadDecodePipeline(fps, self._packet_processor)
+        self._packet_processor = PacketProcessor(self._socket_reader, READER_CPU)
+        self._read_decode_pipeline = ReadDecodePipeline(fps, self._packet_processor, width, height)
         self._bandwidth_monitor = BandwidthMonitor()
 
+        # Network commands are reused for every event
+        self._mouse_move_command = MouseMoveNetworkCommand(self._socket_writer, 0, 0)
+        self._mouse_click_command = MouseClickNetworkCommand(self._socket_writer, 0, 0, MouseButton.LEFT,
+                                                             ButtonState.RELEASE)
+        self._keyboard_event_command = KeyboardEventNetworkCommand(self._socket_writer, "", ButtonState.RELEASE)
+        self._network_batch = NetworkBatchCommand(self._socket_writer)
+
+        # Handlers of events other than mouse motion, which is coalesced in the event loop
+        self._event_handlers = {
+            pygame.MOUSEBUTTONDOWN: self._handle_mouse_button,
+            pygame.MOUSEBUTTONUP: self._handle_mouse_button,
+            pygame.KEYDOWN: self._handle_key,
+            pygame.KEYUP: self._handle_key,
+            pygame.VIDEORESIZE: self._handle_resize,
+            pygame.QUIT: self._handle_quit,
+        }
+        # Set by resize handler, cleared every loop iteration
+        self._window_resized = False
+        # Remote cursor position of the last sent mouse move
+        self._last_mouse_position = None
+
     def run(self) -> None:
         if self._running:
             raise RuntimeError("The 'run' method can only be called once")
         self._running = True
         self._connection.start()
+        self._socket_writer.start()
         self._read_decode_pipeline.start()
         self._packet_processor.start()
 
         pygame.init()
         screen = pygame.display.set_mode((self._window_width, self._window_height + 20), pygame.RESIZABLE)
         pygame.display.set_caption(self._caption)
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(_HANDLED_EVENTS)
         clock = pygame.time.Clock()
         pipe_frame_rate = FrameRateCalculator(1)
+        display_frame_rate = FrameRateCalculator(1)
+
+        # Layouts are built once, only their texts and geometry are updated every frame.
+        # FPS and bandwidth texts are formatted only few times per second.
+        fps_text = TextLayout("FPS: 0.00")
+        pipe_fps_text = TextLayout("Pipeline FPS: 0.00")
+        fps_layout = (FlexboxLayout()
+                      .set_mode("column")
+                      .set_align_items("start")
+                      .set_background((0, 0, 0))
+                      .add_child(fps_text)
+                      .add_child(pipe_fps_text)
+                      .set_text_size(24))
+        hud_next_update = 0
+        was_connected = None
+
+        connected_bandwidth_text = TextLayout("Bandwidth ''")
+        connected_status_bar = (FlexboxLayout()
+                                .set_height(20)
+                                .set_align_items("center")
+                                .set_justify_content("space-between")
+                                .set_background((46, 204, 113))
+                                .add_child(TextLayout("Connected"))
+                                .add_child(connected_bandwidth_text)
+                                .set_text_size(24))
+        disconnected_bandwidth_text = TextLayout("Bandwidth ''")
+        disconnected_status_bar = (FlexboxLayout()
+                                   .set_height(20)
+                                   .set_align_items("center")
+                                   .set_justify_content("space-between")
+                                   .set_background((192, 57, 43))
+                                   .add_child(ThreeDotsTextLayout("Disconnected"))
+                                   .add_child(disconnected_bandwidth_text)
+                                   .set_text_size(24))
+
+        # Hot loop below uses local names instead of attribute and global lookups
+        get_events = pygame.event.get
+        get_ticks = pygame.time.get_ticks
+        flip = pygame.display.flip
+        update = pygame.display.update
+        Rect = pygame.Rect
+        hud_rect = None
+        network_batch = self._network_batch
+        pop_result = self._read_decode_pipeline.pop_result
+        scale_component = self._read_decode_pipeline.get_scale_component()
+        release_surface = scale_component.release_surface
 
         while self._running:
-            clock.tick(self._fps)
-
-            # Handle events
-            for event in pygame.event.get():
-                if event.type == pygame.MOUSEMOTION:
-                    _x, _y = event.pos
-                    if self._if_event_sent_is_possible() and self._if_cords_domain_in_range(_x, _y):
-                        x, y = self._recalculate_cords(_x, _y)
-                        cmd = MouseMoveNetworkCommand(self._socket_writer, x, y)
-                        # cmd.execute()
-
-                elif event.type == pygame.MOUSEBUTTONDOWN or event.type == pygame.MOUSEBUTTONUP:
-                    _x, _y = event.pos
-                    if self._if_event_sent_is_possible() and self._if_cords_domain_in_range(_x, _y):
-                        x, y = self._recalculate_cords(_x, _y)
-
-                        if event.button == pygame.BUTTON_LEFT:
-                            button = MouseButton.LEFT
-                        elif event.button == pygame.BUTTON_RIGHT:
-                            button = MouseButton.RIGHT
-                        elif event.button == pygame.BUTTON_WHEELUP:
-                            button = MouseButton.MIDDLE_WHEEL_UP
-                        elif event.button == pygame.BUTTON_WHEELDOWN:
-                            button = MouseButton.MIDDLE_WHEEL_DOWN
-                        else:
-                            continue
-
-                        state = ButtonState.PRESS if event.type == pygame.MOUSEBUTTONDOWN else ButtonState.RELEASE
-                        cmd = MouseClickNetworkCommand(self._socket_writer, x, y, button, state)
-                        cmd.execute()
-
-                elif event.type == pygame.KEYDOWN or event.type == pygame.KEYUP:
-                    try:
-                        key_code = KEY_MAPPING[event.key]
-                    except KeyError:
-                        # TODO we are skipping not supported keys
-                        continue
-                    state = ButtonState.PRESS if event.type == pygame.KEYDOWN else ButtonState.RELEASE
-                    cmd = KeyboardEventNetworkCommand(self._socket_writer, key_code, state)
-                    cmd.execute()
+            # Input is handled at higher rate than frames are displayed
+            clock.tick(INPUT_FPS)
+            self._window_resized = False
 
-                elif event.type == pygame.VIDEORESIZE:
-                    self._window_width, self._window_height = event.w, event.h
+            # Handle events, packets of network commands are sent together after all events are handled.
+            self._handle_events(get_events(_HANDLED_EVENTS))
+            window_resized = self._window_resized
 
-                elif event.type == pygame.QUIT:
-                    self.stop()
+            # Connection is already stopped when window was closed
+            if self._running:
+                network_batch.execute()
 
-            screen.fill((0, 0, 0))
-
-            # Receive data object
-            data = self._read_decode_pipeline.pop_result()
-
-            # If data from pipeline are available
-            if data is not None:
+            # Receive all data objects, only the latest one is displayed
+            data = None
+            while (result := pop_result()) is not None:
                 # Track fps of pipeline
                 pipe_frame_rate.tick()
 
-                # Handle video data
-                video_data, frames = data
-                width = video_data.get_width()
-                height = video_data.get_height()
-                data = video_data.get_data()
-
-                # Update client width and height
-                self._client_width = width
-                self._client_height = height
-
                 # Update minute bandwidth statistics
-                self._bandwidth_monitor.register_received_bytes(len(data))
+                self._bandwidth_monitor.register_received_bytes(len(result[0].get_data()))
 
-                # Render only last frame
-                frame = frames[-1]
-                img = pygame.image.frombuffer(frame, (width, height), "RGB")
+                # Skipped frame surface can be reused by the pipeline
+                if data is not None:
+                    release_surface(data[2])
+                data = result
+            frame_is_new = data is not None
 
-                # Calculate new width and height while preserving aspect ratio
-                x_offset, y_offset, new_width, new_height = self._calculate_ratio(width, height)
-
-                # Update offset
-                self._x_offset = x_offset
-                self._y_offset = y_offset
+            # If data from pipeline are available
+            scaled_image = None
+            if data is not None:
+                # Handle video data, frame is already scaled to the window by the pipeline
+                video_data, self._last_frame_image, scaled_image = data
 
-                # Update scaled width & height
-                self._scaled_width = new_width
-                self._scaled_height = new_height
+                # Previous frame is replaced below, its surface can be reused by the pipeline
+                if self._last_scaled_image is not None:
+                    release_surface(self._last_scaled_image)
+                self._last_scaled_image = scaled_image
 
-                # Rescale frame
-                self._last_image = pygame.transform.scale(img, (self._scaled_width, self._scaled_height))
+                # Update client width and height
+                self._client_width = video_data.get_width()
+                self._client_height = video_data.get_height()
+
+            layout_changed = False
+            if self._last_frame_image is not None:
+                # Sizes change only on window resize or when client resolution changes
+                layout_key = (self._window_width, self._window_height, self._client_width, self._client_height)
+                layout_changed = layout_key != self._last_layout_key
+                if layout_changed:
+                    self._last_layout_key = layout_key
+                    self._update_layout(self._client_width, self._client_height)
+
+                if frame_is_new or layout_changed:
+                    scaled_size = (self._scaled_width, self._scaled_height)
+                    if scaled_image is not None and scaled_image.get_size() == scaled_size:
+                        self._last_image = scaled_image
+                    else:
+                        # Window was resized after pipeline scaled the frame
+                        resized_image = self._resized_image
+                        if resized_image is not None and resized_image.get_size() == scaled_size:
+                            pygame.transform.scale(self._last_frame_image, scaled_size, resized_image)
+                        else:
+                            resized_image = pygame.transform.scale(self._last_frame_image, scaled_size)
+                            self._resized_image = resized_image
+                        self._last_image = resized_image
 
             is_connected = self._connection.is_connected()
-            if is_connected:
-                # Render frame if there is connection
-                if self._last_image:
-                    screen.blit(self._last_image, (self._x_offset, self._y_offset))
-            else:
+            if not is_connected:
                 # Reset bandwidth monitor
                 self._bandwidth_monitor.reset()
 
-            # Render FPS, Pipeline FPS and bandwidth
-            (FlexboxLayout()
-             .set_mode("column")
-             .set_align_items("start")
-             .set_background((0, 0, 0))
-             .add_child(TextLayout(f"FPS: {clock.get_fps():.2f}"))
-             .add_child(TextLayout(f"Pipeline FPS: {pipe_frame_rate.get_fps():.2f}"))
-             .set_text_size(24)
-             .render(screen))
+            # Update FPS, Pipeline FPS and bandwidth texts
+            now = get_ticks()
+            hud_changed = now >= hud_next_update
+            if hud_changed:
+                hud_next_update = now + HUD_UPDATE_INTERVAL
+                fps_text.set_text("FPS: %.2f" % display_frame_rate.get_fps())
+                pipe_fps_text.set_text("Pipeline FPS: %.2f" % pipe_frame_rate.get_fps())
+                bandwidth = "Bandwidth '%s'" % self._bandwidth_monitor.get_bandwidth_str()
+                connected_bandwidth_text.set_text(bandwidth)
+                disconnected_bandwidth_text.set_text(bandwidth)
+
+            # Redraw and present window only when its content changed
+            if not (frame_is_new or hud_changed or window_resized or is_connected != was_connected):
+                continue
+
+            # Whole window is presented only when its layout changed, otherwise just the changed areas
+            full_update = window_resized or layout_changed or is_connected != was_connected
+            was_connected = is_connected
+
+            frame_visible = is_connected and self._last_image
+            if frame_visible:
+                # Render frame if there is connection, frame covers the window except letterbox bars
+                frame_rect = screen.blit(self._last_image, (self._x_offset, self._y_offset))
+                self._fill_letterbox(screen)
+            else:
+                screen.fill((0, 0, 0))
+
+            # Zero size fits layout to its children again, their texts could change
+            fps_layout.set_size((0, 0)).render(screen)
+            last_hud_rect, hud_rect = hud_rect, Rect(fps_layout.position, fps_layout.size)
 
             # Render status bar
-            bandwidth = self._bandwidth_monitor.get_bandwidth_str()
-            (FlexboxLayout()
+            ((connected_status_bar if is_connected else disconnected_status_bar)
              .set_x(0)
              .set_y(self._window_height)
              .set_width(self._window_width)
-             .set_height(20)
-             .set_align_items("center")
-             .set_justify_content("space-between")
-             .set_background((46, 204, 113) if is_connected else (192, 57, 43))
-             .add_child(
-                TextLayout(f"Connected") if is_connected else
-                ThreeDotsTextLayout(f"Disconnected"))
-             .add_child(TextLayout(f"Bandwidth '{bandwidth}'"))
-             .set_text_size(24)
              .render(screen))
 
             # Render mouse coordinates
             # MouseCoordinates().render(screen)
 
             # Render apply
-            pygame.display.flip()
+            display_frame_rate.tick()
+            if full_update or not frame_visible or last_hud_rect is None:
+                flip()
+            else:
+                dirty_rects = [frame_rect] if frame_is_new else []
+                if hud_changed:
+                    # Previous texts could be wider than current ones
+                    dirty_rects.append(hud_rect.union(last_hud_rect))
+                    dirty_rects.append(Rect(0, self._window_height, self._window_width, 20))
+                update(dirty_rects)
 
         pygame.quit()
 
     def stop(self) -> None:
         self._running = False
         self._connection.stop()
+        self._socket_writer.stop()
         self._packet_processor.stop()
         self._read_decode_pipeline.stop()
 
-    def _calculate_ratio(self, width: int, height: int) -> Tuple[int, int, int, int]:
-        aspect_ratio = float(width) / float(height)
-
-        new_height = self._window_height
-        new_width = int(aspect_ratio * new_height)
+    def _handle_events(self, events: List[pygame.event.Event]) -> None:
+        # Only the last of consecutive mouse motions is handled, cursor position is absolute.
+        # At most one mouse move is thus queued per input tick, besides the ones preceding clicks.
+        MOUSEMOTION, MOUSEBUTTONDOWN, MOUSEBUTTONUP = pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP
+        event_handlers = self._event_handlers
+        last_motion = None
+        for event in events:
+            event_type = event.type
+            if event_type == MOUSEMOTION:
+                last_motion = event
+                continue
+
+            # Keep mouse motion ordered with clicks, e.g. to not break dragging
+            if last_motion is not None and event_type in (MOUSEBUTTONDOWN, MOUSEBUTTONUP):
+                self._handle_mouse_motion(last_motion)
+                last_motion = None
+
+            event_handlers[event_type](event)
+
+        if last_motion is not None:
+            self._handle_mouse_motion(last_motion)
+
+    def _handle_mouse_motion(self, event: pygame.event.Event) -> None:
+        _x, _y = event.pos
+        if self._if_event_sent_is_possible() and self._if_cords_domain_in_range(_x, _y):
+            position = self._recalculate_cords(_x, _y)
+            # Several window pixels can map to the same remote pixel
+            if position != self._last_mouse_position:
+                self._last_mouse_position = position
+                self._mouse_move_command.set(*position)
+                self._network_batch.add(self._mouse_move_command)
+
+    def _handle_mouse_button(self, event: pygame.event.Event) -> None:
+        _x, _y = event.pos
+        if self._if_event_sent_is_possible() and self._if_cords_domain_in_range(_x, _y):
+            button = _MOUSE_BUTTONS.get(event.button)
+            if button is None:
+                return
+
+            x, y = self._recalculate_cords(_x, _y)
+            state = ButtonState.PRESS if event.type == pygame.MOUSEBUTTONDOWN else ButtonState.RELEASE
+            self._mouse_click_command.set(x, y, button, state)
+            self._network_batch.add(self._mouse_click_command)
+
+    def _handle_key(self, event: pygame.event.Event) -> None:
+        try:
+            key_code = KEY_MAPPING[event.key]
+        except KeyError:
+            # TODO we are skipping not supported keys
+            return
+        state = ButtonState.PRESS if event.type == pygame.KEYDOWN else ButtonState.RELEASE
+        self._keyboard_event_command.set(key_code, state)
+        self._network_batch.add(self._keyboard_event_command)
+
+    def _handle_resize(self, event: pygame.event.Event) -> None:
+        self._window_width, self._window_height = event.w, event.h
+        self._read_decode_pipeline.get_scale_component().set_window_size(event.w, event.h)
+        self._window_resized = True
+
+    def _handle_quit(self, event: pygame.event.Event) -> None:
+        self.stop()
+
+    def _update_layout(self, client_width: int, client_height: int) -> None:
+        # Calculate new width and height while preserving aspect ratio
+        x_offset, y_offset, new_width, new_height = self._calculate_ratio(client_width, client_height)
+
+        # Update offset, scaled width & height and input mapping derived from them,
+        # once per layout change instead of on every input event
+        self._x_offset = x_offset
+        self._y_offset = y_offset
+        self._scaled_width = new_width
+        self._scaled_height = new_height
+        self._x_scale = client_width / new_width
+        self._y_scale = client_height / new_height
+        self._x_max = self._window_width - x_offset * 2
+        self._y_max = self._window_height - y_offset * 2
+        self._letterbox_rects = self._calculate_letterbox()
+        self._sizes_ready = True
+
+    def _calculate_letterbox(self) -> Tuple[pygame.Rect, ...]:
+        right = self._x_offset + self._scaled_width
+        bottom = self._y_offset + self._scaled_height
+        # Status bar below the window is always rendered over
+        rects = (pygame.Rect(0, 0, self._window_width, self._y_offset),
+                 pygame.Rect(0, bottom, self._window_width, self._window_height - bottom),
+                 pygame.Rect(0, self._y_offset, self._x_offset, self._scaled_height),
+                 pygame.Rect(right, self._y_offset, self._window_width - right, self._scaled_height))
+        return tuple(rect for rect in rects if rect.width > 0 and rect.height > 0)
+
+    def _fill_letterbox(self, screen: pygame.Surface) -> None:
+        for rect in self._letterbox_rects:
+            screen.fill((0, 0, 0), rect)
 
-        if new_width > self._window_width:
-            new_width = self._window_width
-            new_height = int(new_width / aspect_ratio)
-
-        x_offset = (self._window_width - new_width) // 2
-        y_offset = (self._window_height - new_height) // 2
-
-        return x_offset, y_offset, new_width, new_height
+    def _calculate_ratio(self, width: int, height: int) -> Tuple[int, int, int, int]:
+        return fit_to_window(width, height, self._window_width, self._window_height)
 
     def _if_event_sent_is_possible(self):
-        return (self._client_width is not None
-                and self._client_height is not None
-                and self._x_offset is not None
-                and self._y_offset is not None
-                and self._scaled_width is not None
-                and self._scaled_height is not None)
+        return self._sizes_ready
 
     def _if_cords_domain_in_range(self, x: int, y: int):
-        return (self._x_offset <= x <= self._window_width - self._x_offset * 2
-                and self._y_offset <= y <= self._window_height - self._y_offset * 2)
+        return self._x_offset <= x <= self._x_max and self._y_offset <= y <= self._y_max
 
     def _recalculate_cords(self, x: int, y: int):
-        return (
-            int((x - self._x_offset) * (self._client_width / self._scaled_width)),
-            int((y - self._y_offset) * (self._client_height / self._scaled_height))
-        )
+        return int((x - self._x_offset) * self._x_scale), int((y - self._y_offset) * self._y_scale)
 
 
 if __name__ == "__main__":
+    sys.setswitchinterval(SWITCH_INTERVAL)
     try:
         server = Server(HOST, PORT, 1366, 720, FPS)
         server.run()
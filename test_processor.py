@@ -0,0 +1,93 @@
+import struct
+import unittest
+from unittest import mock
+
+try:
+    from connection import NoDataAvailableError
+    from enums import PacketType, MouseButton, ButtonState
+    from pread import SocketDataReader
+    from processor import PacketProcessor, CommandProcessor
+except ImportError as e:
+    CommandProcessor = None
+    _IMPORT_ERROR = str(e)
+
+
+def _move(x, y):
+    return struct.pack('>BII', PacketType.MOUSE_MOVE, x, y)
+
+
+def _click(x, y, state):
+    return struct.pack('>BBBII', PacketType.MOUSE_CLICK, MouseButton.LEFT, state, x, y)
+
+
+def _key(key, state):
+    return struct.pack('>BI', PacketType.KEYBOARD_EVENT, len(key)) + key.encode() + bytes((state,))
+
+
+_SYNC = b'\x00\x01' * 4
+
+
+class _OneShotConnection:
+    """Returns the given data on the first read, then stops the packet processor."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.packet_processor = None
+
+    def read_into(self, buffer: memoryview) -> int:
+        if self.data is None:
+            self.packet_processor.running.clear()
+            raise NoDataAvailableError
+        size = len(self.data)
+        buffer[:size] = self.data
+        self.data = None
+        return size
+
+
+@unittest.skipIf(CommandProcessor is None, "client dependencies are not installed: %s" %
+                 globals().get("_IMPORT_ERROR"))
+class CommandProcessorOrderTest(unittest.TestCase):
+
+    def _execute(self, data: bytes) -> list:
+        """Reads the data as the client does and returns calls made to pyautogui in order."""
+        connection = _OneShotConnection(data)
+        packet_processor = PacketProcessor(SocketDataReader(connection))
+        connection.packet_processor = packet_processor
+        packet_processor.running.set()
+        packet_processor.run()
+
+        with mock.patch("command.pyautogui") as pyautogui:
+            CommandProcessor(packet_processor).execute_input_packets()
+        return pyautogui.mock_calls
+
+    def test_executes_moves_and_clicks_in_stream_order(self):
+        calls = self._execute(_move(2, 2) + _click(2, 2, ButtonState.PRESS) +
+                              _move(4, 4) + _click(4, 4, ButtonState.RELEASE) +
+                              _move(6, 6))
+
+        self.assertEqual(calls, [mock.call.moveTo(2, 2),
+                                 mock.call.mouseDown(2, 2, "left"),
+                                 mock.call.moveTo(4, 4),
+                                 mock.call.mouseUp(4, 4, "left"),
+                                 mock.call.moveTo(6, 6)])
+
+    def test_executes_only_last_of_consecutive_moves(self):
+        calls = self._execute(_move(1, 1) + _move(2, 2) + _key("ctrl", ButtonState.PRESS) +
+                              _move(3, 3) + _move(4, 4) + _click(4, 4, ButtonState.PRESS) +
+                              _move(5, 5) + _move(6, 6))
+
+        self.assertEqual(calls, [mock.call.moveTo(2, 2),
+                                 mock.call.keyDown("ctrl"),
+                                 mock.call.moveTo(4, 4),
+                                 mock.call.mouseDown(4, 4, "left"),
+                                 mock.call.moveTo(6, 6)])
+
+    def test_drops_packets_with_invalid_fields_until_sync(self):
+        calls = self._execute(_move(1, 1) + _click(1, 1, 7) + _move(2, 2) + _SYNC +
+                              _key("a", 9) + _SYNC + _key("b", ButtonState.PRESS))
+
+        self.assertEqual(calls, [mock.call.moveTo(1, 1), mock.call.keyDown("b")])
+
+
+if __name__ == "__main__":
+    unittest.main()
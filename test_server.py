@@ -0,0 +1,74 @@
+import os
+import struct
+import unittest
+from unittest import mock
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+try:
+    from enums import PacketType, MouseButton, ButtonState
+    from server import Server
+except ImportError as e:
+    Server = None
+    _IMPORT_ERROR = str(e)
+
+
+def _move(x, y):
+    return struct.pack('>BII', PacketType.MOUSE_MOVE, x, y)
+
+
+def _click(x, y, state):
+    return struct.pack('>BBBII', PacketType.MOUSE_CLICK, MouseButton.LEFT, state, x, y)
+
+
+@unittest.skipIf(Server is None, "server dependencies are not installed: %s" % globals().get("_IMPORT_ERROR"))
+class MouseMotionCoalescingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = Server("127.0.0.1", 0, 200, 100, 30)
+        # Window maps 1:1 to the client screen without letterbox
+        self.server._update_layout(200, 100)
+
+    def _send_tick(self, events):
+        """Handles events of one input tick and returns bytes the server writes to the client."""
+        sent = bytearray()
+        # Batch view is released after the write, so its bytes are copied right away
+        with mock.patch("pwrite.SocketDataWriter.write_bytes", autospec=True,
+                        side_effect=lambda writer, data: sent.extend(data)):
+            self.server._handle_events(events)
+            self.server._network_batch.execute()
+        return bytes(sent)
+
+    @staticmethod
+    def _motion(x, y):
+        return pygame.event.Event(pygame.MOUSEMOTION, pos=(x, y), rel=(1, 1), buttons=(0, 0, 0))
+
+    @staticmethod
+    def _button(event_type, x, y):
+        return pygame.event.Event(event_type, pos=(x, y), button=pygame.BUTTON_LEFT)
+
+    def test_sends_at_most_one_move_per_tick(self):
+        sent = self._send_tick([self._motion(x, x // 2) for x in range(100)])
+
+        self.assertEqual(sent, _move(99, 49))
+
+    def test_sends_no_move_when_position_is_unchanged(self):
+        self.assertEqual(self._send_tick([self._motion(10, 10), self._motion(20, 20)]), _move(20, 20))
+        self.assertEqual(self._send_tick([self._motion(5, 5), self._motion(20, 20)]), b"")
+
+    def test_keeps_moves_ordered_with_clicks(self):
+        sent = self._send_tick([self._motion(1, 1), self._motion(2, 2),
+                                self._button(pygame.MOUSEBUTTONDOWN, 2, 2),
+                                self._motion(3, 3), self._motion(4, 4),
+                                self._button(pygame.MOUSEBUTTONUP, 4, 4),
+                                self._motion(5, 5), self._motion(6, 6)])
+
+        self.assertEqual(sent, _move(2, 2) + _click(2, 2, ButtonState.PRESS) +
+                         _move(4, 4) + _click(4, 4, ButtonState.RELEASE) +
+                         _move(6, 6))
+
+
+if __name__ == "__main__":
+    unittest.main()
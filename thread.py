@@ -1,8 +1,6 @@
 import threading
 from abc import abstractmethod
 
-from lock import AutoLockingValue
-
 
 class Task:
     """
@@ -13,22 +11,22 @@ class Task:
     the specific task that the thread should perform.
 
     Attributes:
-    - running: An `AutoLockingValue` instance that tracks whether the task is running.
+    - running: A `threading.Event` instance that is set while the task is running, its check takes no lock.
     - thread: A `threading.Thread` instance that represents the background thread.
     """
 
     def __init__(self):
-        self.running = AutoLockingValue(False)
+        self.running = threading.Event()
         self.thread = threading.Thread(target=self.run)
         self.thread.daemon = True
 
     def start(self):
         print(f"Starting new thread: {self}")
-        self.running.setv(True)
+        self.running.set()
         self.thread.start()
 
     def stop(self):
-        self.running.setv(False)
+        self.running.clear()
         print(f"Exiting: {self}")
         # self.thread.join()
         print(f"Exited: {self}")
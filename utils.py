@@ -1,2 +1,24 @@
+from typing import Tuple
+
+
 def is_localhost(ip: str):
     return ip in ["127.0.0.1", "localhost"]
+
+
+def fit_to_window(width: int, height: int, window_width: int, window_height: int) -> Tuple[int, int, int, int]:
+    """
+    Returns offsets and size of a frame scaled into the window while preserving its aspect ratio.
+    """
+    aspect_ratio = float(width) / float(height)
+
+    new_height = window_height
+    new_width = int(aspect_ratio * new_height)
+
+    if new_width > window_width:
+        new_width = window_width
+        new_height = int(new_width / aspect_ratio)
+
+    x_offset = (window_width - new_width) // 2
+    y_offset = (window_height - new_height) // 2
+
+    return x_offset, y_offset, new_width, new_height